@@ -0,0 +1,481 @@
+import asyncio
+import bisect
+import datetime
+import functools
+import os
+import re
+import types
+from typing import Optional
+
+from fastmcp import Context
+import httpx
+
+from utils import *
+
+
+# Session header carrying the caller's EDT name (lowercase, headers are case-insensitive)
+_MY_EDT_HEADERS = ("my-edt", "my_edt", "x-my-edt")
+
+
+def _no_request():
+    return None
+
+
+async def _maybe_await(value):
+    if hasattr(value, "__await__"):
+        return await value
+    return value
+
+
+# Patterns used to pull extra fields out of raw ICS VEVENT blocks
+_RE_LOCATION = re.compile(r"LOCATION:([^\r\n]+)")
+_RE_ORG_CN = re.compile(r"ORGANIZER:[^\r\n]*CN=([^;\r\n]+)")
+_RE_SUMMARY = re.compile(r"SUMMARY:([^\r\n]+)")
+# '—' is folded into '-' so the prof heuristic can use a plain str.split
+_DASH_TABLE = str.maketrans({"—": "-"})
+
+
+def extract_location_from_ev(ev):
+    """Extract the location (salle) of a parsed event, JSON or ICS."""
+    raw = ev.get("raw")
+    if isinstance(raw, dict):
+        return raw.get("LOCATION") or raw.get("location") or raw.get("room") or raw.get("Salle")
+    if isinstance(raw, str):
+        m = _RE_LOCATION.search(raw)
+        if m:
+            return m.group(1).strip()
+    return None
+
+
+def extract_prof_from_ev(ev):
+    """Extract the professor of a parsed event (ORGANIZER, known keys or SUMMARY heuristic)."""
+    raw = ev.get("raw")
+    if isinstance(raw, dict):
+        for k in ("INTERVENANT", "PROF", "TEACHER", "ENSEIGNANT", "ORGANIZER", "AUTHOR"):
+            v = raw.get(k) or raw.get(k.lower())
+            if v:
+                return v
+        # sometimes professor is inside summary
+        s = raw.get("SUMMARY") or raw.get("summary") or ""
+        if isinstance(s, str):
+            return s
+    if isinstance(raw, str):
+        # try ORGANIZER or SUMMARY contains professor
+        m = _RE_ORG_CN.search(raw)
+        if m:
+            return m.group(1).strip()
+        m2 = _RE_SUMMARY.search(raw)
+        if m2:
+            # heuristic: split on '-' or '—' and return second part if looks like a name
+            s = m2.group(1).strip()
+            parts = s.translate(_DASH_TABLE).split("-")
+            if len(parts) > 1:
+                return parts[-1].strip()
+            return s
+    return None
+
+
+def extract_location(ev):
+    """Extract the location of an event (raw may be dict (JSON) or string (ICS))."""
+    raw = ev.get("raw")
+    if isinstance(raw, dict):
+        return raw.get("LOCATION") or raw.get("location") or raw.get("room") or None
+    if isinstance(raw, str):
+        m = _RE_LOCATION.search(raw)
+        if m:
+            return m.group(1).strip()
+    return None
+
+
+def index_events(events) -> tuple:
+    """Sort events by start and precompute the arrays used by `find_ongoing_and_next`.
+
+    Events must have "end" set (see `_cached_parse`). Returns
+    (starts, max_ends, events) where max_ends[i] is the latest end among
+    events[:i + 1].
+    """
+    evs = tuple(sorted((e for e in events if e.get("start")), key=lambda e: e["start"]))
+    starts = tuple(e["start"] for e in evs)
+    max_ends = []
+    latest = None
+    for e in evs:
+        en = e["end"]
+        if latest is None or en > latest:
+            latest = en
+        max_ends.append(latest)
+    return starts, tuple(max_ends), evs
+
+
+def find_ongoing_and_next(timeline, now: datetime.datetime):
+    """Return (ongoing, next) for an `index_events` timeline.
+
+    - ongoing: the event containing `now` that ends first
+    - next: the first event starting after `now`
+    """
+    starts, max_ends, evs = timeline
+    idx = bisect.bisect_right(starts, now)
+    nxt = evs[idx] if idx < len(evs) else None
+    # courses may overlap, so evs[idx - 1] alone is not enough: walk back until
+    # no earlier event can still be running
+    ongoing = None
+    best_end = None
+    for i in range(idx - 1, -1, -1):
+        if max_ends[i] <= now:
+            break
+        e = evs[i]
+        en = e["end"]
+        if en > now and (best_end is None or en <= best_end):
+            ongoing, best_end = e, en
+    return ongoing, nxt
+
+
+# Name lookups are memoized: the same prof/salle/student is queried over and
+# over, and the asset lists do not change for the life of the process.
+@functools.lru_cache(maxsize=512)
+def _cached_find(nom_key: str, preferred_types: Optional[frozenset], limit: Optional[int]) -> tuple:
+    # entries are stored read-only; callers get fresh dict copies
+    return tuple(types.MappingProxyType(m) for m in find_entries_by_name(nom_key, preferred_types, limit))
+
+
+async def ensure_name_index() -> None:
+    """Build the name index in a worker thread if it is not ready yet.
+
+    Loading the assets downloads them synchronously, which must not happen on
+    the event loop thread shared by every SSE session.
+    """
+    if not name_index_ready():
+        await asyncio.to_thread(warm_name_index)
+
+
+def find_entries(nom: Optional[str], preferred_types: Optional[frozenset] = None, limit: Optional[int] = None) -> list:
+    """Cached `find_entries_by_name` keyed on the normalized name and search options."""
+    # same normalization as find_entries_by_name
+    nom_key = (nom or "").strip().lower()
+    if not nom_key:
+        return []
+    return [dict(m) for m in _cached_find(nom_key, preferred_types, limit)]
+
+
+_SALLE_TYPES = frozenset({"salle", "univ-timetable"})
+_PROF_TYPES = frozenset({"prof"})
+
+
+# Parsed events of the update endpoint, keyed by (url, day) and stored as an
+# `index_events` timeline together with the fetch time of the body they were
+# parsed from: an entry is only served while that exact body is the live one
+# in the response cache.
+_PARSED_CACHE: dict[tuple[str, str], tuple[float, tuple]] = {}
+
+
+def _get_parsed(url: str, day: str) -> Optional[tuple]:
+    hit = _PARSED_CACHE.get((url, day))
+    if hit and hit[0] == cached_stamp(url):
+        return hit[1]
+    return None
+
+
+def _drop_parsed(url: Optional[str]) -> None:
+    if url is None:
+        _PARSED_CACHE.clear()
+    else:
+        for k in [k for k in _PARSED_CACHE if k[0] == url]:
+            del _PARSED_CACHE[k]
+
+
+on_invalidate(_drop_parsed)
+
+
+def _cached_parse(url: str, day: str, content: str) -> tuple:
+    """Parse `content` (the live cached body of `url`) for `day` and cache the events."""
+    events = _get_parsed(url, day)
+    if events is not None:
+        return events
+    events = parse_update_json_events(content, only_date=day)
+    # fallback to ICS parsing if nothing
+    if not events:
+        events = parse_ics_events(content)
+    # a missing end means a zero-length event; normalize it once here so the
+    # timeline code can read ev["end"] directly
+    for ev in events:
+        if ev["end"] is None:
+            ev["end"] = ev["start"]
+    events = index_events(events)
+    stamp = cached_stamp(url)
+    if stamp is None:
+        return events
+    if len(_PARSED_CACHE) >= 256:
+        # drop entries whose body is gone or was replaced before growing further
+        for k in [k for k, (ts, _) in _PARSED_CACHE.items() if ts != cached_stamp(k[0])]:
+            del _PARSED_CACHE[k]
+    _PARSED_CACHE[(url, day)] = (stamp, events)
+    return events
+
+
+async def _today_events(url: str, day: str) -> tuple:
+    """Return the `index_events` timeline of `url` for `day`, fetching it if needed.
+
+    Shared by `disponibilite_salle` and `ou_est_prof` so both reuse the same
+    cached body and parsed events; fetch errors propagate to the caller.
+    """
+    events = _get_parsed(url, day)
+    if events is None:
+        events = _cached_parse(url, day, await cached_fetch(url))
+    return events
+
+
+def summarize_next_course(url: str, content: str, now: Optional[datetime.datetime] = None) -> dict:
+    """Build the `prochain_cours` response from the update endpoint body."""
+    # The update endpoint returns JSON (see the provided PHP). Try parsing JSON first.
+    update_next = parse_update_json_and_next_event(content, now)
+    if update_next:
+        # try to find the matching event in parsed JSON events for richer info
+        try:
+            events = parse_update_json_events(content)
+        except Exception:
+            events = []
+        rich = None
+        if events:
+            # convert update_next start to datetime for matching
+            try:
+                upd_dt = parse_iso_datetime(update_next.get("start"))
+            except Exception:
+                upd_dt = None
+            if upd_dt:
+                # index by start (reversed so the first event of a slot wins)
+                by_start = {ev["start"]: ev for ev in reversed(events) if ev.get("start")}
+                ev = by_start.get(upd_dt)
+                if ev:
+                    rich = {
+                        "start": ev["start"].isoformat(),
+                        "summary": ev.get("summary"),
+                        "location": extract_location_from_ev(ev),
+                        "prof": extract_prof_from_ev(ev),
+                    }
+        if not rich:
+            # fallback: return the simple update_next
+            return {"ok": True, "source": url, "next": update_next}
+        return {"ok": True, "source": url, "next": rich}
+
+    # If no next event found in JSON, still try ICS parsing fallback in case the endpoint forwarded ICS
+    ics_next = parse_ics_next_event(content, now)
+    if ics_next:
+        return {"ok": True, "source": url, "next": ics_next}
+
+    # Fallback: return raw content snippet and the URL so the caller can inspect
+    return {"ok": True, "source": url, "next": None, "raw_snippet": content[:2000]}
+
+
+def _with_range(resp: dict, start_dt: Optional[datetime.datetime], end_dt: Optional[datetime.datetime]) -> dict:
+    """Add the requested search window (if any) to a disponibilite_salle response."""
+    if start_dt:
+        resp["range_start"] = start_dt.isoformat()
+    if end_dt:
+        resp["range_end"] = end_dt.isoformat()
+    return resp
+
+
+def summarize_salle(url: str, events, now: datetime.datetime, start_dt: Optional[datetime.datetime] = None, end_dt: Optional[datetime.datetime] = None) -> dict:
+    """Build the `disponibilite_salle` response from an `index_events` timeline."""
+    # If a range was provided, keep only events that intersect the window:
+    # starting before the window end and ending after the window start
+    if start_dt or end_dt:
+        starts, _, evs = events
+        win_start = start_dt or datetime.datetime.min
+        hi = bisect.bisect_left(starts, end_dt) if end_dt else len(evs)
+        events = index_events(ev for ev in evs[:hi] if ev["end"] > win_start)
+
+    ongoing, nxt = find_ongoing_and_next(events, now)
+    # event currently happening
+    if ongoing:
+        return _with_range({"ok": True, "available": False, "until": ongoing["end"].isoformat(), "summary": ongoing.get("summary"), "source": url}, start_dt, end_dt)
+
+    # next upcoming
+    if nxt:
+        return _with_range({"ok": True, "available": True, "free_until": nxt["start"].isoformat(), "next_summary": nxt.get("summary"), "source": url}, start_dt, end_dt)
+
+    # no more events today -> free all day
+    return _with_range({"ok": True, "available": True, "free_until": None, "note": "Aucun cours r\u00e9pertori\u00e9 pour aujourd\u2019hui", "source": url}, start_dt, end_dt)
+
+
+def summarize_prof(nom: str, url: str, events, now: datetime.datetime) -> dict:
+    """Build the `ou_est_prof` response from an `index_events` timeline."""
+    ongoing, nxt = find_ongoing_and_next(events, now)
+    if ongoing:
+        loc = extract_location(ongoing) or ongoing.get("summary")
+        return {"ok": True, "name": nom, "status": "in_class", "until": ongoing["end"].isoformat(), "location": loc, "summary": ongoing.get("summary"), "source": url}
+
+    # next upcoming
+    if nxt:
+        loc = extract_location(nxt) or nxt.get("summary")
+        return {"ok": True, "name": nom, "status": "free_now", "next_start": nxt["start"].isoformat(), "next_location": loc, "next_summary": nxt.get("summary"), "source": url}
+
+    return {"ok": True, "name": nom, "status": "free_all_day", "note": "Aucun cours répertorié pour aujourd'hui", "source": url}
+
+
+async def prochain_cours(nom: Optional[str] = None, ctx: Optional[Context] = None) -> dict:
+    """MCP tool: retourne le prochain cours (heure + résumé) pour un nom d'EDT.
+
+    - recherche case-insensitive dans les fichiers locaux
+    - construit l'URL ADE selon adeProjectId
+    - tente de récupérer et parser un ICS pour trouver le prochain événement
+    """
+    # If caller did not provide a name or used an alias for self, fall back to
+    # (1) the HTTP header MY_EDT supplied by the client for this session (via ctx),
+    # (2) then to the environment variable MY_EDT.
+    if not nom or not str(nom).strip() or str(nom).strip().lower() in ("me", "moi", "self"):
+        # Try extract from context headers (session-scoped)
+        nom_from_ctx = None
+        if ctx is not None:
+            try:
+                # attempt to get request object (may be sync or awaitable)
+                req = getattr(ctx, "request", None) or await _maybe_await(getattr(ctx, "get_http_request", _no_request)())
+                headers = getattr(req, "headers", None)
+                if headers:
+                    # Starlette headers are case-insensitive
+                    nom_from_ctx = next((v for v in map(headers.get, _MY_EDT_HEADERS) if v), None)
+            except Exception:
+                nom_from_ctx = None
+
+        if nom_from_ctx:
+            nom = nom_from_ctx
+        else:
+            env = os.getenv("MY_EDT", "").strip() or None
+            if env:
+                nom = env
+            else:
+                return {"ok": False, "error": "Aucun nom fourni et MY_EDT non configuré"}
+
+    await ensure_name_index()
+    matches = find_entries(nom)
+    if not matches:
+        return {"ok": False, "error": "Aucune entrée trouvée pour ce nom"}
+
+    # use first match for now
+    entry = matches[0]
+    now = datetime.datetime.now()
+    # Build the single update URL to edt.infuseting.fr
+    url = build_ade_url(entry, date=now.date())
+    if url:
+        try:
+            content = await cached_fetch(url)
+        except Exception as e:
+            return {"ok": False, "error": f"Erreur lors de la récupération de l'URL: {e}", "url": url}
+
+        return summarize_next_course(url, content, now)
+
+    # If we couldn't build an update URL (missing adeProjectId/adeResources), fall back to searching the raw entry
+    return {"ok": False, "error": "Impossible de construire l'URL de mise à jour (adeProjectId ou adeResources manquant)", "matches": matches}
+
+
+async def disponibilite_salle(nom: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None, ctx: Optional[Context] = None) -> dict:
+    """Retourne la disponibilité d'une salle (free/busy) et l'heure de fin si occupée.
+
+    Logic:
+    - cherche la salle dans `salle` (ou timetable/univ)
+    - appelle l'endpoint de mise à jour pour la date d'aujourd'hui
+    - récupère la liste d'events pour aujourd'hui
+    - si un event englobe maintenant -> occupied until its DTEND (ou DTSTART if no DTEND)
+    - else -> free until next event start (or None pour la fin de journée)
+
+    Paramètres supplémentaires:
+    - start: chaîne 'HH:MM' ou ISO datetime pour limiter la recherche
+    - end: chaîne 'HH:MM' ou ISO datetime pour limiter la recherche
+    """
+
+
+    await ensure_name_index()
+    # prefer entries of type 'salle' or 'univ-timetable'
+    matches = find_entries(nom, _SALLE_TYPES, limit=1)
+    if not matches:
+        return {"ok": False, "error": "Aucune salle trouvée pour ce nom"}
+
+    entry = matches[0]
+
+    now = datetime.datetime.now()
+    today = now.date()
+    today_str = today.isoformat()
+
+    url = build_ade_url(entry, date=today)
+    if not url:
+        return {"ok": False, "error": "Impossible de construire l'URL de mise à jour pour cette salle", "matches": matches}
+
+    try:
+        events = await _today_events(url, today_str)
+    except httpx.HTTPError as e:
+        return {"ok": False, "error": f"Erreur lors de la récupération de l'URL: {e}", "url": url}
+
+    # parse optional limits
+    start_dt = parse_limit_to_datetime(start)
+    end_dt = parse_limit_to_datetime(end)
+
+    # If both provided but invalid range
+    if start_dt and end_dt and end_dt < start_dt:
+        return {"ok": False, "error": "La limite de fin est antérieure à la limite de début"}
+
+    return summarize_salle(url, events, now, start_dt, end_dt)
+
+
+async def ou_est_prof(nom: str = None) -> dict:
+    """Retourne où se trouve (ou sera) un professeur.
+
+    Comportement :
+    - Recherche le professeur dans les assets (comme les autres tools)
+    - Récupère l'update endpoint pour la date d'aujourd'hui
+    - Parse les events (JSON fallback ICS)
+    - Si un event englobe `now` -> retourne la salle/summary et la fin
+    - Sinon -> retourne le prochain event avec heure et lieu
+    """
+
+    await ensure_name_index()
+    # Prefer prof entries
+    matches = find_entries(nom, _PROF_TYPES, limit=1)
+    if not matches:
+        return {"ok": False, "error": "Aucune entrée trouvée pour ce nom"}
+
+    entry = matches[0]
+
+    now = datetime.datetime.now()
+    today = now.date()
+    today_str = today.isoformat()
+
+    # Fetch today's events
+    url = build_ade_url(entry, date=today)
+    if not url:
+        return {"ok": False, "error": "Impossible de construire l'URL de mise à jour (adeProjectId ou adeResources manquant)", "matches": matches}
+
+    try:
+        events = await _today_events(url, today_str)
+    except httpx.HTTPError as e:
+        return {"ok": False, "error": f"Erreur lors de la récupération de l'URL: {e}", "url": url}
+
+    return summarize_prof(nom, url, events, now)
+
+async def _batch_query(q: dict, ctx: Optional[Context]) -> dict:
+    q = q or {}
+    kind = q.get("kind")
+    if kind == "prochain_cours":
+        return await prochain_cours(q.get("nom"), ctx)
+    if kind == "disponibilite_salle":
+        return await disponibilite_salle(q.get("nom"), q.get("start"), q.get("end"), ctx)
+    if kind == "ou_est_prof":
+        return await ou_est_prof(q.get("nom"))
+    return {"ok": False, "error": f"Type de requête inconnu: {kind}"}
+
+
+async def edt_batch(queries: list[dict], ctx: Optional[Context] = None) -> list[dict]:
+    """Exécute plusieurs requêtes prochain_cours / disponibilite_salle / ou_est_prof.
+
+    - chaque requête passe par l'outil correspondant (même résolution du nom,
+      mêmes erreurs, même format de réponse)
+    - les requêtes sont exécutées en parallèle ; une URL commune n'est récupérée
+      qu'une fois (cache et verrou par URL de `cached_fetch`)
+    """
+    return list(await asyncio.gather(*(_batch_query(q, ctx) for q in queries)))
+
+
+def register(mcp) -> None:
+    """Register the EDT tools on a FastMCP server."""
+    mcp.tool(name="prochain_cours", title="Prochain cours", description="Donne le prochain cours et son heure à partir du nom d'un EDT (prof/salle/student/univ). Si aucun nom n'est fourni, utilise MY_EDT si configuré. L'IA doit fournir les dates au format ISO complet (ex: 2025-10-25T08:00:00 ou 2025-10-25T08:00).")(prochain_cours)
+    mcp.tool(name="disponibilite_salle", title="Disponibilité salle", description="Indique si une salle est disponible maintenant et jusqu\u2019\u00e0 quelle heure. Si une heure de debut et/ou de fin est fournie (ex: '08:00' ou ISO), limite la recherche à cette plage horaire. Les réponses incluent les dates/horaires au format ISO complet (ex: 2025-10-25T08:00:00).")(disponibilite_salle)
+    mcp.tool(name="ou_est_prof", title="Où est le prof", description="Donne la localisation actuelle d'un enseignant (salle / en ligne) ou son prochain lieu. ")(ou_est_prof)
+    mcp.tool(name="edt_batch", title="Requêtes EDT groupées", description="Exécute plusieurs requêtes EDT en un seul appel. `queries` est une liste d'objets {kind, nom} où kind vaut prochain_cours, disponibilite_salle (accepte aussi start/end) ou ou_est_prof. Retourne la liste des réponses dans le même ordre, au même format que les outils individuels.")(edt_batch)
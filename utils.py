@@ -1,11 +1,31 @@
+import asyncio
 import json
-import urllib.request
-import urllib.parse
+import logging
+import os
+from urllib.parse import quote
 import datetime
+import functools
 import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import httpx
+import urllib3
 from utils import *
 from typing import Optional
 
+_log = logging.getLogger("mcpedt")
+
+# orjson decodes the (large) update endpoint payloads several times faster
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 base_url = "https://edt.infuseting.fr/assets/json/"
 prof_url = base_url + "prof.json"
 salle_url = base_url + "salle.json"
@@ -13,20 +33,149 @@ student_url = base_url + "student.json"
 univ_url = base_url + "univ.json"
 
 
+# Pooled sync HTTP client: requests to edt.infuseting.fr reuse the same
+# keep-alive connection (and TLS session) instead of reconnecting each time.
+_POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=8,
+    headers={"User-Agent": "MCPEdtUnicaen/1.0"},
+    retries=urllib3.Retry(total=2),
+)
+
+
+def _content_charset(content_type: Optional[str]) -> str:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"')
+    return "utf-8"
+
+
+def fetch_url(url: str, timeout: int = 15) -> str:
+    """GET `url` with the shared connection pool and return the decoded body."""
+    resp = _POOL.request("GET", url, timeout=urllib3.Timeout(connect=5, read=timeout))
+    if resp.status >= 400:
+        raise urllib3.exceptions.HTTPError(f"HTTP {resp.status} for {url}")
+    return resp.data.decode(_content_charset(resp.headers.get("content-type")), errors="ignore")
+
+
 def load_json(path: str):
     """Load JSON from local file or URL."""
     if path.startswith("http://") or path.startswith("https://"):
-        with urllib.request.urlopen(path) as resp:
-            return json.load(resp)
-    else:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return None
+        return _loads(fetch_url(path))
+    with open(path, "rb") as f:
+        return _loads(f.read())
+
+
+# Asset lists are kept on disk and only re-downloaded when the server says they
+# changed (ETag / Last-Modified), instead of a full download on every start.
+_CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "mcpedt")
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write `data` to a temp file next to `path`, then rename it into place.
+
+    Readers (including other server processes) see either the old or the new
+    file, never a truncated one.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _load_asset(url: str, fname: str):
+    """Load an asset JSON, revalidating the on-disk copy with the server.
+
+    Falls back to the on-disk copy if the server cannot be reached.
+    """
+    path = os.path.join(_CACHE_DIR, fname)
+    meta_path = path + ".meta"
+    headers = dict(_POOL.headers)
+    if os.path.exists(path):
+        try:
+            meta = _loads(_read_file(meta_path))
+        except Exception:
+            meta = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        resp = _POOL.request("GET", url, headers=headers, timeout=urllib3.Timeout(connect=5, read=15))
+        if resp.status >= 400:
+            raise urllib3.exceptions.HTTPError(f"HTTP {resp.status} for {url}")
+    except Exception:
+        if os.path.exists(path):
+            return _loads(_read_file(path))
+        raise
+    if resp.status == 304:
+        return _loads(_read_file(path))
+
+    data = _loads(resp.data)
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        # drop the validators first: a crash below must not leave an ETag that
+        # would revalidate a body which was never written
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        _write_atomic(path, resp.data)
+        meta = {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError:
+        pass
+    return data
+
+
+# Asset lists are loaded on first use rather than at import, so importing the
+# module (and FastMCP startup) does not wait on the network.
+_prof_data = None
+_salle_data = None
+_student_data = None
+_univ_data = None
+_ASSETS_LOCK = threading.RLock()
+
+
+def _load_assets():
+    global _prof_data, _salle_data, _student_data, _univ_data
+    if _univ_data is not None:
+        return
+    with _ASSETS_LOCK:
+        if _univ_data is not None:
+            return
+        # the four downloads are independent: run them concurrently
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            prof, salle, student, univ = executor.map(
+                lambda asset: _load_asset(asset[1], asset[0] + ".json").get(asset[0], []),
+                (("prof", prof_url), ("salle", salle_url), ("student", student_url), ("univ", univ_url)),
+            )
+        _prof_data, _salle_data, _student_data = prof, salle, student
+        # assigned last: marks the assets as loaded
+        _univ_data = univ
+
+# Client-supplied limits and event starts are parsed over and over with the same
+# values; datetimes are immutable so results can be shared.
+parse_iso_datetime = functools.lru_cache(maxsize=2048)(datetime.datetime.fromisoformat)
+
+# date-only limits accepted by `parse_limit_to_datetime`
+_RE_DATE_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}$", re.ASCII)
+_RE_DATE_EU = re.compile(r"^(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})$", re.ASCII)
+_WORDS_TODAY = frozenset(("today", "aujourd'hui", "aujourdhui"))
+_WORDS_TOMORROW = frozenset(("tomorrow", "demain"))
 
-_prof_data = load_json(prof_url).get("prof", [])
-_salle_data = load_json(salle_url).get("salle", [])
-_student_data = load_json(student_url).get("student", [])
-_univ_data = load_json(univ_url).get("univ", [])
 
 def parse_limit_to_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
     """Try to parse a start/end limit string into a datetime.
@@ -42,23 +191,33 @@ def parse_limit_to_datetime(value: Optional[str]) -> Optional[datetime.datetime]
     if not s:
         return None
 
-    # Try ISO datetime parse first (also accepts 'YYYY-MM-DD HH:MM' / 'YYYY-MM-DDTHH:MM')
-    try:
-        return datetime.datetime.fromisoformat(s)
-    except Exception:
-        pass
+    # Short-circuit time-only strings like HH:MM or HH:MM:SS (interpreted for today)
+    if len(s) <= 8 and ":" in s:
+        parts = s.split(":")
+        if len(parts) in (2, 3) and len(parts[0]) <= 2 and all(len(p) == 2 for p in parts[1:]) and all(p.isdecimal() for p in parts):
+            try:
+                return datetime.datetime.combine(datetime.date.today(), datetime.time(*map(int, parts)))
+            except ValueError:
+                return None
+
+    # Try ISO datetime parse first (also accepts 'YYYY-MM-DD HH:MM' / 'YYYY-MM-DDTHH:MM');
+    # every ISO form starts with a 4-digit year, so other inputs skip the raise
+    if s[:4].isdecimal():
+        try:
+            return parse_iso_datetime(s)
+        except ValueError:
+            pass
 
     # Common date-only formats: YYYY-MM-DD, DD/MM/YYYY, DD-MM-YYYY
     # Interpret as start of that day (00:00:00)
-    m_date_iso = re.match(r"^(\d{4})-(\d{2})-(\d{2})$", s)
-    if m_date_iso:
+    if len(s) == 10 and _RE_DATE_ISO.match(s):
         try:
             d = datetime.date.fromisoformat(s)
             return datetime.datetime.combine(d, datetime.time.min)
-        except Exception:
+        except ValueError:
             pass
 
-    m_date_eu = re.match(r"^(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})$", s)
+    m_date_eu = _RE_DATE_EU.match(s) if 8 <= len(s) <= 10 else None
     if m_date_eu:
         try:
             day = int(m_date_eu.group(1))
@@ -66,77 +225,155 @@ def parse_limit_to_datetime(value: Optional[str]) -> Optional[datetime.datetime]
             year = int(m_date_eu.group(3))
             d = datetime.date(year, month, day)
             return datetime.datetime.combine(d, datetime.time.min)
-        except Exception:
+        except ValueError:
             pass
 
     # Natural words
-    if s.lower() in ("today", "aujourd'hui", "aujourdhui"):
+    word = s.lower()
+    if word in _WORDS_TODAY:
         d = datetime.date.today()
         return datetime.datetime.combine(d, datetime.time.min)
-    if s.lower() in ("tomorrow", "demain"):
+    if word in _WORDS_TOMORROW:
         d = datetime.date.today() + datetime.timedelta(days=1)
         return datetime.datetime.combine(d, datetime.time.min)
 
-    # If it's only a time like HH:MM or HH:MM:SS, interpret for today
-    m = re.match(r"^(\d{1,2}):(\d{2})(:(\d{2}))?$", s)
-    if m:
-        hour = int(m.group(1))
-        minute = int(m.group(2))
-        second = int(m.group(4)) if m.group(4) else 0
-        today = datetime.date.today()
-        try:
-            return datetime.datetime.combine(today, datetime.time(hour, minute, second))
-        except Exception:
-            return None
-
     # Unknown format
     return None
-def find_entries_by_name(name: str):
+
+
+@dataclass(slots=True)
+class Entry:
+    """A searchable prof/student/salle/univ record, flattened once at load time."""
+    type: str
+    desc: Optional[str]
+    desc_l: str
+    adeUniv: Optional[str]
+    adeResources: Optional[str]
+    adeProjectId: Optional[int]
+    timetable: Optional[list] = None
+
+    def to_dict(self) -> dict:
+        """Public dict form returned by `find_entries_by_name`."""
+        d = {
+            "type": self.type,
+            "desc": self.desc,
+            "adeUniv": self.adeUniv,
+            "adeResources": self.adeResources,
+            "adeProjectId": self.adeProjectId,
+        }
+        if self.type == "univ":
+            d["timetable"] = self.timetable
+        return d
+
+
+def _project_id(it: dict) -> Optional[int]:
+    pid = it.get("adeProjectId")
+    return int(pid) if pid is not None else None
+
+
+def _load_entries() -> tuple:
+    """Flatten prof/student/salle/univ assets into `Entry` records, in search order."""
+    _load_assets()
+    entries = []
+    for items, typ in ((_prof_data, "prof"), (_student_data, "student"), (_salle_data, "salle")):
+        for it in items:
+            desc = (it.get("descTT") or "").strip()
+            if desc:
+                entries.append(Entry(typ, desc, desc.lower(), it.get("adeUniv"), it.get("adeResources"), _project_id(it)))
+    # univ entries have nameUniv and timetable list
+    for u in _univ_data:
+        timetable = u.get("timetable", [])
+        entries.append(Entry("univ", u.get("nameUniv"), (u.get("nameUniv", "") or "").lower(), u.get("adeUniv"), None, None, timetable))
+        for t in timetable:
+            entries.append(Entry("univ-timetable", t.get("descTT"), (t.get("descTT", "") or "").lower(), u.get("adeUniv"), t.get("adeResources"), _project_id(t)))
+    return tuple(entries)
+
+
+def _build_name_index():
+    """Load the entries once and index their lowercased descriptions.
+
+    Returns (entries, index) where index maps every 3-character substring to
+    the set of positions of the entries containing it.
+    """
+    entries = _load_entries()
+    index = {}
+    for i, r in enumerate(entries):
+        desc_l = r.desc_l
+        for j in range(len(desc_l) - 2):
+            index.setdefault(desc_l[j:j + 3], set()).add(i)
+    return entries, index
+
+
+_NAME_INDEX = None
+
+
+def _get_name_index():
+    """Return (entries, index), building them on first use."""
+    global _NAME_INDEX
+    if _NAME_INDEX is None:
+        with _ASSETS_LOCK:
+            if _NAME_INDEX is None:
+                _NAME_INDEX = _build_name_index()
+    return _NAME_INDEX
+
+
+def name_index_ready() -> bool:
+    """True once the assets are loaded and the name index is built."""
+    return _NAME_INDEX is not None
+
+
+def warm_name_index() -> None:
+    """Load the assets and build the name index now (blocking: downloads)."""
+    _get_name_index()
+
+
+def find_entries_by_name(name: str, preferred_types: Optional[frozenset] = None, limit: Optional[int] = None):
     """Search in prof/student/salle/univ for matching descTT/nameUniv.
 
+    Queries of 3+ characters are narrowed with the trigram index before the
+    substring check; shorter ones scan every record.
+
+    If preferred_types is given, entries of those types are returned first
+    (each group in search order). With limit, at most that many entries are
+    returned and the search stops as soon as enough preferred ones are found.
+
     Returns a list of entries with keys: type, desc, adeUniv, adeResources, adeProjectId
     """
     name_l = name.lower()
-    results = []
+    entries, index = _get_name_index()
+    if len(name_l) < 3:
+        candidates = entries
+    else:
+        postings = []
+        for j in range(len(name_l) - 2):
+            p = index.get(name_l[j:j + 3])
+            if not p:
+                return []
+            postings.append(p)
+        postings.sort(key=len)
+        hits = postings[0].intersection(*postings[1:])
+        candidates = (entries[i] for i in sorted(hits))
+
+    preferred, others = [], []
+    for r in candidates:
+        if name_l not in r.desc_l:
+            continue
+        if not preferred_types or r.type in preferred_types:
+            preferred.append(r)
+            if limit is not None and len(preferred) >= limit:
+                break
+        else:
+            others.append(r)
+    found = preferred + others
+    if limit is not None:
+        found = found[:limit]
+    return [r.to_dict() for r in found]
 
-    def check_list(items, key_desc, typ):
-        for it in items:
-            desc = (it.get(key_desc) or "").strip()
-            if desc and name_l in desc.lower():
-                results.append({
-                    "type": typ,
-                    "desc": desc,
-                    "adeUniv": it.get("adeUniv"),
-                    "adeResources": it.get("adeResources"),
-                    "adeProjectId": int(it.get("adeProjectId")) if it.get("adeProjectId") is not None else None,
-                })
-
-    check_list(_prof_data, "descTT", "prof")
-    check_list(_student_data, "descTT", "student")
-    check_list(_salle_data, "descTT", "salle")
-    # univ entries have nameUniv and timetable list
-    for u in _univ_data:
-        if name_l in (u.get("nameUniv","") or "").lower():
-            results.append({
-                "type": "univ",
-                "desc": u.get("nameUniv"),
-                "adeUniv": u.get("adeUniv"),
-                "adeResources": None,
-                "adeProjectId": None,
-                "timetable": u.get("timetable", []),
-            })
-        # also check timetable entries
-        for t in u.get("timetable", []):
-            if name_l in (t.get("descTT","") or "").lower():
-                results.append({
-                    "type": "univ-timetable",
-                    "desc": t.get("descTT"),
-                    "adeUniv": u.get("adeUniv"),
-                    "adeResources": t.get("adeResources"),
-                    "adeProjectId": int(t.get("adeProjectId")) if t.get("adeProjectId") is not None else None,
-                })
-
-    return results
+
+@functools.lru_cache(maxsize=2048)
+def _update_url(ade_project_id: int, ade_resources: str, d: datetime.date) -> str:
+    # the four parameters have a fixed shape: only adeResources needs escaping
+    return f"https://edt.infuseting.fr/update/index.php?adeBase={ade_project_id}&adeRessources={quote(ade_resources, safe='')}&lastUpdate=0&date={d:%Y-%m-%d}"
 
 
 def build_ade_url(entry, date: datetime.date | None = None):
@@ -151,139 +388,253 @@ def build_ade_url(entry, date: datetime.date | None = None):
     adeProjectId = entry.get("adeProjectId")
     if adeProjectId is None or adeResources is None:
         return None
-    d = date or datetime.date.today()
-    params = {
-        "adeBase": str(adeProjectId),
-        "adeRessources": str(adeResources),
-        "lastUpdate": "0",
-        "date": d.strftime("%Y-%m-%d"),
-    }
-    print("https://edt.infuseting.fr/update/index.php" + "?" + urllib.parse.urlencode(params))
-    return "https://edt.infuseting.fr/update/index.php" + "?" + urllib.parse.urlencode(params)
+    url = _update_url(int(adeProjectId), str(adeResources), date or datetime.date.today())
+    _log.debug("ade_url=%s", url)
+    return url
+
+
+# Shared async client: keeps connections (and TLS sessions) to the update
+# endpoint alive across tool calls instead of reconnecting every time. Created
+# lazily on the serving event loop and closed by the server lifespan.
+_HTTP: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _HTTP
+    if _HTTP is None or _HTTP.is_closed:
+        _HTTP = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            headers={"User-Agent": "MCPEdtUnicaen/1.0"},
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=8, keepalive_expiry=30.0),
+        )
+    return _HTTP
+
+
+async def afetch_url(url: str, timeout: float = 15) -> str:
+    """Async counterpart of `fetch_url`, using the shared keep-alive client."""
+    r = await _get_client().get(url, timeout=timeout)
+    r.raise_for_status()
+    return r.text
+
+
+async def aclose_http_client():
+    """Close the shared async client (it is recreated on next use)."""
+    global _HTTP
+    if _HTTP is not None and not _HTTP.is_closed:
+        await _HTTP.aclose()
+    _HTTP = None
+
+
+# Short-lived cache of update endpoint responses keyed by URL: calendars change
+# at human timescales, so repeated queries within the TTL reuse the same body.
+_URL_TTL = 60.0
+_URL_CACHE_MAX = 512
+_URL_CACHE: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_URL_LOCKS: "defaultdict[str, asyncio.Lock]" = defaultdict(asyncio.Lock)
+# callers holding or queued on each URL's lock
+_URL_WAITERS: "defaultdict[str, int]" = defaultdict(int)
+
+
+def _url_cache_get(url: str) -> Optional[str]:
+    hit = _URL_CACHE.get(url)
+    if hit and time.monotonic() - hit[0] < _URL_TTL:
+        _URL_CACHE.move_to_end(url)
+        return hit[1]
+    return None
 
 
-def fetch_url(url: str, timeout: int = 15) -> str:
-    req = urllib.request.Request(url, headers={"User-Agent": "MCPEdtUnicaen/1.0"})
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        charset = resp.headers.get_content_charset() or "utf-8"
-        return resp.read().decode(charset, errors="ignore")
+# Callbacks run by `invalidate_cache`, for caches derived from the responses
+_INVALIDATE_HOOKS: list = []
 
 
-def parse_ics_next_event(ics_text: str):
-    """Very small ICS parser: extract VEVENT DTSTART/SUMMARY and return next event after now.
+def on_invalidate(hook) -> None:
+    """Register `hook(url)`, called whenever `invalidate_cache(url)` runs (url is None for all)."""
+    _INVALIDATE_HOOKS.append(hook)
+
 
-    Returns dict or None.
+def cached_stamp(url: str) -> Optional[float]:
+    """Fetch time of the live cached response for `url`, or None if missing or expired.
+
+    Lets derived caches check that they were built from the current body.
     """
-    now = datetime.datetime.now()
-    events = []
-    parts = re.split(r"BEGIN:VEVENT\r?\n", ics_text)
-    for part in parts[1:]:
-        # limit to until END:VEVENT
-        vevent = part.split("END:VEVENT")[0]
-        m = re.search(r"DTSTART(?:;[^:]+)?:([0-9TZ+-]+)", vevent)
-        if not m:
-            continue
-        dtstr = m.group(1).strip()
-        # ignore all-day events (DATE only)
-        if re.fullmatch(r"\d{8}", dtstr):
-            continue
-        # try parse
-        dt = None
-        try:
-            if dtstr.endswith("Z"):
-                dt = datetime.datetime.strptime(dtstr, "%Y%m%dT%H%M%SZ")
-            else:
-                # try with seconds
-                try:
-                    dt = datetime.datetime.strptime(dtstr, "%Y%m%dT%H%M%S")
-                except Exception:
-                    dt = datetime.datetime.strptime(dtstr, "%Y%m%dT%H%M")
-        except Exception:
-            # fallback: skip
-            continue
+    hit = _URL_CACHE.get(url)
+    if hit and time.monotonic() - hit[0] < _URL_TTL:
+        return hit[0]
+    return None
+
+
+def invalidate_cache(url: Optional[str] = None) -> None:
+    """Drop the cached response for `url`, or every cached response if None."""
+    if url is None:
+        _URL_CACHE.clear()
+    else:
+        _URL_CACHE.pop(url, None)
+    for hook in _INVALIDATE_HOOKS:
+        hook(url)
+
+
+async def cached_fetch(url: str) -> str:
+    """`afetch_url` behind a per-URL TTL cache.
+
+    Concurrent calls for the same URL wait on a shared lock so that only one
+    request goes upstream.
+    """
+    content = _url_cache_get(url)
+    if content is not None:
+        return content
+    _URL_WAITERS[url] += 1
+    try:
+        async with _URL_LOCKS[url]:
+            content = _url_cache_get(url)
+            if content is not None:
+                return content
+            content = await afetch_url(url)
+            _URL_CACHE[url] = (time.monotonic(), content)
+            _URL_CACHE.move_to_end(url)
+            while len(_URL_CACHE) > _URL_CACHE_MAX:
+                old, _ = _URL_CACHE.popitem(last=False)
+                lock = _URL_LOCKS.get(old)
+                if lock is not None and not lock.locked() and old not in _URL_WAITERS:
+                    del _URL_LOCKS[old]
+    finally:
+        _URL_WAITERS[url] -= 1
+        if not _URL_WAITERS[url]:
+            del _URL_WAITERS[url]
+            # a failed fetch caches nothing, so eviction would never drop the
+            # lock: forget it once nobody is queued on it anymore
+            if url not in _URL_CACHE:
+                _URL_LOCKS.pop(url, None)
+    return content
+
+
+# VEVENT block splitter, compiled once: parsing runs it over every ICS payload
+_RE_VEVENT = re.compile(r"BEGIN:VEVENT\r?\n(.*?)(?:END:VEVENT|(?=BEGIN:VEVENT\r?\n)|\Z)", re.DOTALL)
+
+# content lines kept by `_ics_fields` (property name -> length of the name)
+_ICS_FIELDS = {"DTSTART": 7, "DTEND": 5, "SUMMARY": 7}
+
+
+def _ics_dt_key(s: str) -> Optional[str]:
+    """Normalize a fixed-layout date-time to 'YYYYmmddTHHMMSS', or None.
+
+    Accepts YYYYmmddTHHMMSS[Z] and YYYYmmddTHHMM. Keys of the same width sort
+    like the date-times they encode, so they can be compared as strings (as long
+    as the year has 4 digits, like `strftime("%Y")` gives for years 1000-9999).
+    """
+    if not isinstance(s, str):
+        return None
+    n = len(s)
+    if n == 16 and s[15] == "Z":
+        n = 15
+    if n not in (13, 15) or s[8] != "T" or not (s[:8] + s[9:n]).isdecimal():
+        return None
+    return s[:15] if n == 15 else s[:13] + "00"
+
 
-        # summary
-        s = ""
-        m2 = re.search(r"SUMMARY:(.+)", vevent)
-        if m2:
-            s = m2.group(1).strip()
+def _fast_ics_dt(s: str) -> Optional[datetime.datetime]:
+    """Parse a fixed-layout date-time (YYYYmmddTHHMMSS[Z] or YYYYmmddTHHMM).
+
+    Slices the digits directly instead of going through strptime and its
+    exceptions. Returns None for any other layout.
+    """
+    k = _ics_dt_key(s)
+    if k is None:
+        return None
+    try:
+        return datetime.datetime(
+            int(k[0:4]), int(k[4:6]), int(k[6:8]),
+            int(k[9:11]), int(k[11:13]), int(k[13:15]),
+        )
+    except ValueError:
+        return None
 
-        events.append({"start": dt, "summary": s, "raw": vevent})
 
-    # pick next
-    future = [e for e in events if e["start"] and e["start"] > now]
-    if not future:
+def _parse_update_dt(s) -> Optional[datetime.datetime]:
+    """Parse an update endpoint date-time: fixed ICS layout first, then ISO 8601."""
+    if not s:
         return None
-    future.sort(key=lambda e: e["start"])
-    nxt = future[0]
-    return {"start": nxt["start"].isoformat(), "summary": nxt["summary"]}
+    dt = _fast_ics_dt(s)
+    if dt is None:
+        try:
+            dt = datetime.datetime.fromisoformat(s)
+        except (TypeError, ValueError):
+            return None
+    return dt
+
+
+def _ics_fields(vevent: str) -> dict:
+    """Collect DTSTART/DTEND/SUMMARY values of a VEVENT body in one pass.
+
+    Property parameters (``DTSTART;TZID=...:``) are skipped; the first
+    occurrence of each property wins.
+    """
+    fields = {}
+    for line in vevent.split("\n"):
+        for name, n in _ICS_FIELDS.items():
+            if line[:n] == name and line[n:n + 1] in (":", ";") and name not in fields:
+                i = line.find(":", n)
+                if i != -1:
+                    fields[name] = line[i + 1:].strip()
+                break
+    return fields
+
+
+def parse_ics_next_event(ics_text: str, now: Optional[datetime.datetime] = None):
+    """Very small ICS parser: extract VEVENT DTSTART/SUMMARY and return next event after now.
+
+    `now` defaults to the current time. Returns dict or None.
+    """
+    now = now or datetime.datetime.now()
+    # compare DTSTART keys as strings and only parse the ones that beat `best`;
+    # this ordering only holds for 4-digit years, which is all ADE ever emits
+    now_key = now.strftime("%Y%m%dT%H%M%S")
+    best = best_key = None
+    for vevent_m in _RE_VEVENT.finditer(ics_text):
+        fields = _ics_fields(vevent_m.group(1))
+        # all-day events (DATE only) have no time part and are rejected here
+        key = _ics_dt_key(fields.get("DTSTART", ""))
+        if key is None or key <= now_key or (best_key is not None and key >= best_key):
+            continue
+        dt = _fast_ics_dt(key)
+        if dt:
+            best, best_key = (dt, fields.get("SUMMARY", "")), key
+
+    return {"start": best[0].isoformat(), "summary": best[1]} if best else None
 
 
 def parse_ics_events(ics_text: str):
     """Parse ICS and return list of events with start, end, summary."""
     events = []
-    parts = re.split(r"BEGIN:VEVENT\r?\n", ics_text)
-    for part in parts[1:]:
-        vevent = part.split("END:VEVENT")[0]
-        m = re.search(r"DTSTART(?:;[^:]+)?:([0-9TZ+-]+)", vevent)
-        if not m:
-            continue
-        dtstart = m.group(1).strip()
-        # skip all-day
-        if re.fullmatch(r"\d{8}", dtstart):
+    for vevent_m in _RE_VEVENT.finditer(ics_text):
+        vevent = vevent_m.group(1)
+        fields = _ics_fields(vevent)
+        # skip all-day (DATE only) events
+        dt1 = _fast_ics_dt(fields.get("DTSTART", ""))
+        if not dt1:
             continue
-        dt1 = None
-        try:
-            if dtstart.endswith("Z"):
-                dt1 = datetime.datetime.strptime(dtstart, "%Y%m%dT%H%M%SZ")
-            else:
-                try:
-                    dt1 = datetime.datetime.strptime(dtstart, "%Y%m%dT%H%M%S")
-                except Exception:
-                    dt1 = datetime.datetime.strptime(dtstart, "%Y%m%dT%H%M")
-        except Exception:
-            continue
-
-        # DTEND
-        dt2 = None
-        m2 = re.search(r"DTEND(?:;[^:]+)?:([0-9TZ+-]+)", vevent)
-        if m2:
-            dtend = m2.group(1).strip()
-            try:
-                if dtend.endswith("Z"):
-                    dt2 = datetime.datetime.strptime(dtend, "%Y%m%dT%H%M%SZ")
-                else:
-                    try:
-                        dt2 = datetime.datetime.strptime(dtend, "%Y%m%dT%H%M%S")
-                    except Exception:
-                        dt2 = datetime.datetime.strptime(dtend, "%Y%m%dT%H%M")
-            except Exception:
-                dt2 = None
-
-        s = ""
-        m3 = re.search(r"SUMMARY:(.+)", vevent)
-        if m3:
-            s = m3.group(1).strip()
+        dt2 = _fast_ics_dt(fields["DTEND"]) if "DTEND" in fields else None
+        s = fields.get("SUMMARY", "")
 
         events.append({"start": dt1, "end": dt2, "summary": s, "raw": vevent})
 
     return events
 
 
-def parse_update_json_and_next_event(json_text: str):
+def parse_update_json_and_next_event(json_text: str, now: Optional[datetime.datetime] = None):
     """Parse JSON returned by https://edt.infuseting.fr/update and find next event.
 
     Expected structure: { "YYYY-MM-DD": { "content": [ { 'DTSTART': 'YYYYmmddTHHMMSS', 'SUMMARY': '...' }, ... ], 'lastUpdate': ... }, ... }
-    Returns next event dict or None.
+    `now` defaults to the current time. Returns next event dict or None.
     """
     try:
-        data = json.loads(json_text)
+        data = _loads(json_text)
     except Exception:
         return None
 
-    now = datetime.datetime.now()
-    events = []
-    for key, val in data.items():
+    now = now or datetime.datetime.now()
+    best = None
+    for val in data.values():
         # skip non-dict
         if not isinstance(val, dict):
             continue
@@ -295,29 +646,14 @@ def parse_update_json_and_next_event(json_text: str):
             summary = ev.get("SUMMARY") or ev.get("summary") or ev.get("SUMMARY:CONFERENCE") or ""
             if not dtstr:
                 continue
-            # try parsing with common formats
-            dt = None
-            for fmt in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M"):
-                try:
-                    dt = datetime.datetime.strptime(dtstr, fmt)
-                    break
-                except Exception:
-                    continue
+            dt = _parse_update_dt(dtstr)
             if not dt:
-                # try ISO parse fallback
-                try:
-                    dt = datetime.datetime.fromisoformat(dtstr)
-                except Exception:
-                    continue
+                continue
 
-            events.append({"start": dt, "summary": summary, "raw": ev})
+            if dt > now and (best is None or dt < best[0]):
+                best = (dt, summary)
 
-    future = [e for e in events if e["start"] and e["start"] > now]
-    if not future:
-        return None
-    future.sort(key=lambda e: e["start"])
-    nxt = future[0]
-    return {"start": nxt["start"].isoformat(), "summary": nxt["summary"]}
+    return {"start": best[0].isoformat(), "summary": best[1]} if best else None
 
 
 def parse_update_json_events(json_text: str, only_date: str | None = None):
@@ -326,14 +662,14 @@ def parse_update_json_events(json_text: str, only_date: str | None = None):
     If only_date is provided (YYYY-MM-DD), only events for that date are returned.
     """
     try:
-        data = json.loads(json_text)
+        data = _loads(json_text)
     except Exception:
         return []
 
+    # only the requested day's bucket is walked; other dates are never touched
+    buckets = (data.get(only_date),) if only_date else data.values()
     events = []
-    for key, val in data.items():
-        if only_date and key != only_date:
-            continue
+    for val in buckets:
         if not isinstance(val, dict):
             continue
         content = val.get("content") or []
@@ -343,34 +679,10 @@ def parse_update_json_events(json_text: str, only_date: str | None = None):
             dtstr = ev.get("DTSTART") or ev.get("start") or None
             dtendstr = ev.get("DTEND") or ev.get("end") or None
             summary = ev.get("SUMMARY") or ev.get("summary") or ""
-            if not dtstr:
-                continue
-            dt = None
-            for fmt in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M"):
-                try:
-                    dt = datetime.datetime.strptime(dtstr, fmt)
-                    break
-                except Exception:
-                    continue
+            dt = _parse_update_dt(dtstr)
             if not dt:
-                try:
-                    dt = datetime.datetime.fromisoformat(dtstr)
-                except Exception:
-                    continue
-
-            dtend = None
-            if dtendstr:
-                for fmt in ("%Y%m%dT%H%M%S", "%Y%m%dT%H%M"):
-                    try:
-                        dtend = datetime.datetime.strptime(dtendstr, fmt)
-                        break
-                    except Exception:
-                        continue
-                if not dtend:
-                    try:
-                        dtend = datetime.datetime.fromisoformat(dtendstr)
-                    except Exception:
-                        dtend = None
+                continue
+            dtend = _parse_update_dt(dtendstr)
 
             events.append({"start": dt, "end": dtend, "summary": summary, "raw": ev})
 